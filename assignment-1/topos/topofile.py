@@ -0,0 +1,267 @@
+"""
+Streaming reader for the .in topology format:
+
+  nHosts nSwitches nLinks
+  h1,s1
+  s1,s2
+  ...
+
+Hosts are named h1..hN and switches s1..sM. Links are read one line at a time,
+so the file is never held in memory as a whole.
+
+load() also accepts generator specs (ring:N, star:N, fat-tree:k) and can cache
+validated files in the user's cache directory, keyed by path, mtime and size.
+"""
+
+import hashlib
+import json
+import os
+
+TOPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Per user, so a cache written by one user is never trusted by another (e.g. root under sudo).
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "topocache")
+
+
+class TopoFileError(ValueError):
+  """
+  Malformed topology file, reported with the file name and line number
+  """
+
+  def __init__(self, fileName, lineno, message):
+    ValueError.__init__(self, "%s:%d: %s" % (fileName, lineno, message))
+    self.fileName = fileName
+    self.lineno = lineno
+
+
+class TopoFile(object):
+  """
+  Header of a .in file, with the links available as a validating generator
+  """
+
+  def __init__(self, fileName):
+    self.fileName = fileName
+
+    with open(fileName, "r") as f:
+      header = f.readline()
+
+    try:
+      counts = [int(x) for x in header.split()]
+    except ValueError:
+      counts = []
+    if len(counts) != 3 or min(counts) < 0:
+      raise TopoFileError(fileName, 1, "expected header 'nHosts nSwitches nLinks', got %r" % header.strip())
+
+    self.nHosts, self.nSwitches, self.nLinks = counts
+
+  def checkNode(self, name, lineno):
+    limits = {"h": self.nHosts, "s": self.nSwitches}
+    kind, number = name[:1], name[1:]
+    if kind not in limits or not number.isdigit():
+      raise TopoFileError(self.fileName, lineno, "invalid node name %r, expected h<n> or s<n>" % name)
+    if not 1 <= int(number) <= limits[kind]:
+      raise TopoFileError(self.fileName, lineno, "node %s out of range, the header declares %d %s" %
+                          (name, limits[kind], "hosts" if kind == "h" else "switches"))
+
+  def links(self):
+    """
+    Yields each link as a (node1, node2) tuple, checking node references and
+    that the number of links matches the header
+    """
+    count = 0
+    lineno = 1
+
+    with open(self.fileName, "r") as f:
+      f.readline()
+      for lineno, line in enumerate(f, 2):
+        line = line.strip()
+        if not line:
+          continue
+
+        fields = [x.strip() for x in line.split(",")]
+        if len(fields) != 2:
+          raise TopoFileError(self.fileName, lineno, "expected 'node1,node2', got %r" % line)
+        for name in fields:
+          self.checkNode(name, lineno)
+        if fields[0] == fields[1]:
+          raise TopoFileError(self.fileName, lineno, "link connects %s to itself" % fields[0])
+
+        count += 1
+        if count > self.nLinks:
+          raise TopoFileError(self.fileName, lineno, "more links than the %d declared in the header" % self.nLinks)
+
+        yield fields[0], fields[1]
+
+    if count < self.nLinks:
+      raise TopoFileError(self.fileName, lineno, "found %d links, the header declares %d" % (count, self.nLinks))
+
+
+class Topology(object):
+  """
+  Parsed or generated topology with the same interface as TopoFile
+  """
+
+  def __init__(self, nHosts, nSwitches, nLinks, links):
+    self.nHosts = nHosts
+    self.nSwitches = nSwitches
+    self.nLinks = nLinks
+    self.linkSource = links
+
+  def links(self):
+    return iter(self.linkSource())
+
+
+def ring(n):
+  """
+  n switches in a ring, one host on each
+  """
+  def links():
+    for i in range(1, n + 1):
+      yield "h%d" % i, "s%d" % i
+    if n == 2:
+      yield "s1", "s2"
+    elif n > 2:
+      for i in range(1, n + 1):
+        yield "s%d" % i, "s%d" % (i % n + 1)
+
+  nRing = 0 if n < 2 else 1 if n == 2 else n
+  return Topology(n, n, n + nRing, links)
+
+
+def star(n):
+  """
+  n leaf switches around hub switch s<n+1>, one host on each leaf
+  """
+  def links():
+    for i in range(1, n + 1):
+      yield "h%d" % i, "s%d" % i
+    for i in range(1, n + 1):
+      yield "s%d" % (n + 1), "s%d" % i
+
+  return Topology(n, n + 1, 2 * n, links)
+
+
+def fatTree(k):
+  """
+  k-ary fat tree: (k/2)^2 core switches s1.., then per pod k/2 aggregation and
+  k/2 edge switches, with k/2 hosts on every edge switch
+  """
+  if k < 2 or k % 2:
+    raise ValueError("fat-tree needs an even k >= 2, got %d" % k)
+  half = k // 2
+  nCore = half * half
+
+  def links():
+    host = 0
+    for pod in range(k):
+      agg = nCore + pod * k + 1
+      edge = agg + half
+      for e in range(half):
+        for _ in range(half):
+          host += 1
+          yield "h%d" % host, "s%d" % (edge + e)
+      for a in range(half):
+        for e in range(half):
+          yield "s%d" % (agg + a), "s%d" % (edge + e)
+        for c in range(half):
+          yield "s%d" % (agg + a), "s%d" % (a * half + c + 1)
+
+  return Topology(k * half * half, nCore + k * k, 3 * k * half * half, links)
+
+
+GENERATORS = {"ring": ring, "star": star, "fat-tree": fatTree}
+
+
+def resolve(fileName):
+  """
+  Resolves a relative .in path against the current directory, falling back to
+  the directory holding the topology modules
+  """
+  if os.path.isabs(fileName) or os.path.exists(fileName):
+    return os.path.abspath(fileName)
+  return os.path.join(TOPO_DIR, fileName)
+
+
+def cacheLinks(cacheFile):
+  """
+  Streams the links of a cache file, one "node1,node2" line after the header
+  """
+  with open(cacheFile, "r") as f:
+    f.readline()
+    for line in f:
+      yield tuple(line.rstrip("\n").split(","))
+
+
+def writeThrough(topoFile, cacheFile, header):
+  """
+  Streams and validates the links of topoFile while copying them to a cache
+  file, which only replaces the old entry once every link has been read
+  """
+  tmpName = "%s.%d" % (cacheFile, os.getpid())
+  f = None
+  # A failed write only costs the next run a fresh parse.
+  try:
+    if not os.path.isdir(os.path.dirname(cacheFile)):
+      os.makedirs(os.path.dirname(cacheFile), 0o700)
+    f = open(tmpName, "w")
+    f.write(json.dumps(header) + "\n")
+  except (IOError, OSError):
+    f = None
+
+  try:
+    for link in topoFile.links():
+      if f is not None:
+        try:
+          f.write("%s,%s\n" % link)
+        except (IOError, OSError):
+          f.close()
+          os.remove(tmpName)
+          f = None
+      yield link
+    if f is not None:
+      f.close()
+      f = None
+      os.rename(tmpName, cacheFile)
+  finally:
+    if f is not None:
+      f.close()
+      os.remove(tmpName)
+
+
+def cached(path, cacheDir=None):
+  """
+  Loads a .in file through a cache entry that is reused while the file's
+  mtime and size are unchanged. Links stream from the entry instead of being
+  revalidated, and a missing entry is written while the file is parsed, so
+  neither path holds the link list in memory.
+  """
+  cacheDir = cacheDir or CACHE_DIR
+  stat = os.stat(path)
+  key = {"path": path, "mtime": stat.st_mtime, "size": stat.st_size}
+  cacheFile = os.path.join(cacheDir, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".links")
+
+  try:
+    with open(cacheFile, "r") as f:
+      entry = json.loads(f.readline())
+    if all(entry.get(name) == value for name, value in key.items()):
+      return Topology(entry["nHosts"], entry["nSwitches"], entry["nLinks"], lambda: cacheLinks(cacheFile))
+  except (IOError, OSError, ValueError, KeyError):
+    pass
+
+  topoFile = TopoFile(path)
+  header = dict(key, nHosts=topoFile.nHosts, nSwitches=topoFile.nSwitches, nLinks=topoFile.nLinks)
+  return Topology(topoFile.nHosts, topoFile.nSwitches, topoFile.nLinks, lambda: writeThrough(topoFile, cacheFile, header))
+
+
+def load(spec, cache=False):
+  """
+  Returns the topology for a .in file name or a generator spec such as ring:8,
+  reading .in files through the cache only when asked to
+  """
+  kind, _, size = spec.partition(":")
+  if kind in GENERATORS:
+    if not size.isdigit():
+      raise ValueError("expected %s:<n>, got %r" % (kind, spec))
+    return GENERATORS[kind](int(size))
+
+  path = resolve(spec)
+  return cached(path) if cache else TopoFile(path)
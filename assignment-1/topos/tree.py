@@ -0,0 +1,109 @@
+#!/usr/bin/python
+
+import inspect, json, os, resource, sys, time
+from mininet.topo import Topo
+from mininet.util import ipAdd, macColonHex
+
+# mn --custom execs this file without setting __file__, so locate it through the code object.
+TOPO_DIR = os.path.dirname(os.path.abspath(inspect.currentframe().f_code.co_filename))
+sys.path.insert(1, TOPO_DIR)
+from topofile import load
+
+
+class TreeTopo(Topo):
+  """
+  Topology read from a .in file or generated from a ring:N, star:N or
+  fat-tree:k spec, e.g. mn --custom tree.py --topo tree,ring:16
+
+  summary=1 (--summary when run directly) replaces the counts printed before
+  the build with a build time and peak memory summary on stderr afterwards,
+  cache=1 (--cache) reads .in files through the per-user topology cache
+  """
+
+  def build(self, spec="star.in", summary=False, cache=False):
+    start = time.time()
+    topo = load(spec, cache=cache)
+
+    nHosts = topo.nHosts
+    nSwitches = topo.nSwitches
+    nLinks = topo.nLinks
+
+    if not summary:
+      print("Number of Hosts: ", nHosts)
+      print("Number of Switches: ", nSwitches)
+      print("Number of Links: ", nLinks)
+
+    for h in range(1, nHosts + 1):
+      hconfig = {"ip": "%s/8" % ipAdd(h), "mac": macColonHex(h)}
+
+      self.addHost("h%d" % h, **hconfig)
+
+    for s in range(1, nSwitches + 1):
+      sconfig = {"dpid": "%016x" % s}
+
+      self.addSwitch("s%d" % s, **sconfig)
+
+    for link in topo.links():
+      self.addLink(link[0], link[1])
+
+    if summary:
+      self.buildTime = time.time() - start
+      # ru_maxrss is reported in kilobytes on Linux.
+      self.maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+      # stderr, so the summary stays out of the --netcfg JSON on stdout.
+      sys.stderr.write("Built %d hosts, %d switches, %d links in %.2fs, peak memory %.1f MB\n" %
+                       (nHosts, nSwitches, nLinks, self.buildTime, self.maxRss / 1024.0))
+
+
+def netcfg(topo):
+  """
+  ONOS network configuration for a built TreeTopo: every switch as an of:<dpid>
+  device, every host with its MAC, IP and attachment point, and every
+  switch-to-switch link in both directions, using the topology's port numbers
+  """
+  devices, hosts, links = {}, {}, {}
+
+  def connectPoint(switch, port):
+    return "of:%s/%d" % (topo.nodeInfo(switch)["dpid"], port)
+
+  for switch in topo.switches():
+    devices["of:%s" % topo.nodeInfo(switch)["dpid"]] = {"basic": {"name": switch}}
+
+  for node1, node2, info in topo.iterLinks(withInfo=True):
+    end1, end2 = (node1, info["port1"]), (node2, info["port2"])
+    if topo.isSwitch(node1) and topo.isSwitch(node2):
+      for src, dst in ((end1, end2), (end2, end1)):
+        links["%s-%s" % (connectPoint(*src), connectPoint(*dst))] = {"basic": {"type": "DIRECT"}}
+      continue
+
+    (host, _), switch = (end1, end2) if topo.isSwitch(node2) else (end2, end1)
+    if not topo.isSwitch(switch[0]):
+      continue
+    hinfo = topo.nodeInfo(host)
+    entry = hosts.setdefault("%s/-1" % hinfo["mac"], {"basic": {"name": host, "ips": [hinfo["ip"].split("/")[0]], "locations": []}})
+    entry["basic"]["locations"].append(connectPoint(*switch))
+
+  return {"devices": devices, "hosts": hosts, "links": links}
+
+
+topos = {"sdnip": TreeTopo, "tree": TreeTopo}
+
+if __name__ == "__main__":
+  flags = [arg for arg in sys.argv[1:] if arg in ("--summary", "--cache", "--netcfg")]
+  for flag in flags:
+    sys.argv.remove(flag)
+  if len(sys.argv) < 2:
+    sys.exit("usage: %s [--summary] [--cache] [--netcfg] <file.in | ring:N | star:N | fat-tree:k> [controller ...]" % sys.argv[0])
+  spec = sys.argv.pop(1)
+
+  # --netcfg prints the ONOS network configuration instead of starting Mininet.
+  cache = "--cache" in flags
+  if "--netcfg" in flags:
+    json.dump(netcfg(TreeTopo(spec, summary=True, cache=cache)), sys.stdout, indent=2, sort_keys=True)
+    sys.exit()
+  summary = "--summary" in flags
+
+  sys.path.insert(1, "/home/sdn/onos/topos")
+  from onosnet import run
+
+  run(TreeTopo(spec, summary=summary, cache=cache))
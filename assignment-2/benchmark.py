@@ -0,0 +1,121 @@
+import json
+import os
+import subprocess
+import tempfile
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass
+from time import monotonic, time
+
+import router
+from autotester import CACHE, configure_routers, stop_routers, wait_for_convergence
+from mininet.link import Link
+from mininet.log import setLogLevel, warn
+from mininet.net import Mininet
+from synthetic import EBGP_MESHES, generate
+
+
+@dataclass
+class Sample:
+    version: str
+    frr_version: str
+    timestamp: float
+    ases: int
+    routers_per_as: int
+    mesh: str
+    routers: int
+    links: int
+    build: float
+    startup: float
+    convergence: float
+    check: float
+    memory_per_router_kb: float
+
+
+def version() -> str:
+    directory = os.path.dirname(os.path.realpath(__file__))
+    result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=directory, capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def frr_version() -> str:
+    result = subprocess.run(["/usr/lib/frr/zebra", "--version"], capture_output=True, text=True)
+    return result.stdout.splitlines()[0] if result.stdout else "unknown"
+
+
+def memory_kb(pid) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def measure(ases, routers_per_as, mesh, convergence_timeout) -> Sample:
+    lab = generate(ases, routers_per_as, mesh)
+    with tempfile.TemporaryDirectory() as directory:
+        lab.write(directory)
+        router.DIRECTORY = directory
+        CACHE.invalidate()
+
+        start = monotonic()
+        topology = lab.topology()
+        configure_routers(topology, deferStart=True, logLevel="warnings", logSink="none")
+        net = Mininet(topo=topology, link=Link, autoSetMacs=True)
+        net.start()
+        build = monotonic() - start
+        try:
+            routers = [host for host in net.hosts if isinstance(host, router.FRRRouter)]
+            start = monotonic()
+            router.start_routers(routers)
+            startup = monotonic() - start
+
+            convergence = wait_for_convergence(net, convergence_timeout)
+
+            start = monotonic()
+            states = CACHE.states(net, [host.name for host in routers])
+            for entry in lab.neighbors:
+                if not states[entry["node"]].summary.established(entry["include"]):
+                    warn(f'({entry["node"]}) BGP sessions not established\n')
+            check = monotonic() - start
+
+            memory = sum(memory_kb(pid) for host in routers for pid in host.daemonPids())
+        finally:
+            stop_routers(net)
+            net.stop()
+
+    return Sample(
+        version(),
+        frr_version(),
+        time(),
+        ases,
+        routers_per_as,
+        mesh,
+        len(lab.nodes),
+        len(lab.links),
+        build,
+        startup,
+        convergence,
+        check,
+        memory / len(lab.nodes),
+    )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Measure how FRR lab bring-up, convergence and checks scale with size.")
+    parser.add_argument("--ases", required=False, type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--routers-per-as", required=False, type=int, default=3)
+    parser.add_argument("--mesh", required=False, default="ring", choices=EBGP_MESHES)
+    parser.add_argument("--convergence-timeout", required=False, type=float, default=120)
+    parser.add_argument("--output", required=False, default="benchmark.jsonl", help="append one JSON line per run")
+    settings = parser.parse_args()
+
+    setLogLevel("warn")
+    for ases in settings.ases:
+        sample = measure(ases, settings.routers_per_as, settings.mesh, settings.convergence_timeout)
+        warn(f"{ases} ASes, {sample.routers} routers: build {sample.build:.1f}s startup {sample.startup:.1f}s "
+             f"convergence {sample.convergence}s check {sample.check:.2f}s\n")
+        with open(settings.output, "a") as f:
+            f.write(json.dumps(asdict(sample)) + "\n")
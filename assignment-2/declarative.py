@@ -0,0 +1,59 @@
+from ipaddress import ip_interface
+
+from mininet.topo import Topo
+from router import FRRRouter
+
+
+def infer_links(nodes) -> list:
+    """Pairs up interfaces that share a subnet, returning ((node, interface), (node, interface)) links.
+
+    Each subnet must hold exactly two interfaces, as every link in the lab is point to point. Runs in linear time.
+    """
+    subnets = {}
+    for node in nodes:
+        for interface, address in node["interfaces"].items():
+            subnets.setdefault(ip_interface(address).network, []).append((node["name"], interface))
+
+    links = []
+    for subnet, members in subnets.items():
+        if len(members) != 2:
+            raise ValueError(f"subnet {subnet} has {len(members)} interfaces {members}, expected exactly 2")
+        links.append(tuple(members))
+    return links
+
+
+class DeclarativeTopology(Topo):
+    """Builds a topology from node declarations in the EXPECTED_HOSTS format of features.py.
+
+    Nodes with a loopback become routers. Links are inferred from shared subnets unless given explicitly as
+    ((node, interface), (node, interface)) pairs. Hosts get a default route via the router on their subnet.
+    """
+
+    def build(self, nodes, links=None, routerClass=FRRRouter):
+        declared = {node["name"]: node for node in nodes}
+        if links is None:
+            links = infer_links(nodes)
+
+        gateways = {}
+        for (name1, intf1), (name2, intf2) in links:
+            for (name, intf), (peer, peer_intf) in (((name1, intf1), (name2, intf2)), ((name2, intf2), (name1, intf1))):
+                if "loopback" not in declared[name] and "loopback" in declared[peer]:
+                    gateways[name] = str(ip_interface(declared[peer]["interfaces"][peer_intf]).ip)
+
+        for node in nodes:
+            if "loopback" in node:
+                self.addNode(name=node["name"], loopback=node["loopback"], cls=routerClass)
+            else:
+                ip = next(iter(node["interfaces"].values()))
+                route = {"defaultRoute": f"via {gateways[node['name']]}"} if node["name"] in gateways else {}
+                self.addHost(name=node["name"], ip=ip, **route)
+
+        for (name1, intf1), (name2, intf2) in links:
+            self.addLink(
+                name1,
+                name2,
+                intfName1=intf1,
+                intfName2=intf2,
+                params1={"ip": declared[name1]["interfaces"][intf1]},
+                params2={"ip": declared[name2]["interfaces"][intf2]},
+            )
@@ -0,0 +1,116 @@
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+
+SUMMARY = 'vtysh -c "show bgp summary json"'
+RIB = 'vtysh -c "show bgp ipv4 unicast json"'
+RIP = 'vtysh -c "show ip rip"'
+BGP = 'vtysh -c "show ip bgp"'
+RUNNING_CONFIG = 'vtysh -c "show running-config"'
+
+# Commands needed to build a RouterState, queried once per router.
+STATE_COMMANDS = [SUMMARY, RIB, RIP, BGP, RUNNING_CONFIG]
+
+
+def route_command(prefix):
+    return f'vtysh -c "show bgp ipv4 unicast {prefix} json"'
+
+
+def load_json(output) -> dict:
+    try:
+        data = json.loads(output)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+@dataclass
+class BgpPeer:
+    address: str
+    remote_as: Optional[int]
+    state: str
+
+    @property
+    def established(self):
+        return self.state == "Established"
+
+
+@dataclass
+class BgpSummary:
+    asn: Optional[int] = None
+    router_id: Optional[str] = None
+    peers: dict = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, output) -> "BgpSummary":
+        data = load_json(output).get("ipv4Unicast", {})
+        peers = {
+            address: BgpPeer(address, peer.get("remoteAs"), peer.get("state", ""))
+            for address, peer in data.get("peers", {}).items()
+        }
+        return cls(data.get("as"), data.get("routerId"), peers)
+
+    def established(self, addresses) -> bool:
+        return all(address in self.peers and self.peers[address].established for address in addresses)
+
+
+@dataclass
+class BgpPath:
+    prefix: str
+    next_hop: Optional[str]
+    metric: Optional[int] = None
+    local_preference: Optional[int] = None
+    community: Optional[str] = None
+    best: bool = False
+
+    @classmethod
+    def parse(cls, prefix, path) -> "BgpPath":
+        nexthops = path.get("nexthops") or [{}]
+        community = path.get("community", {}).get("string")
+        best = path.get("bestpath") not in (None, False)
+        return cls(prefix, nexthops[0].get("ip"), path.get("metric"), path.get("locPrf"), community, best)
+
+
+def parse_rib(output) -> dict:
+    """Parses "show bgp ipv4 unicast json" into BgpPaths keyed by prefix."""
+    routes = load_json(output).get("routes", {})
+    return {prefix: [BgpPath.parse(prefix, path) for path in paths] for prefix, paths in routes.items()}
+
+
+def parse_route(output) -> list:
+    """Parses the detailed "show bgp ipv4 unicast <prefix> json" view, which includes communities."""
+    data = load_json(output)
+    return [BgpPath.parse(data.get("prefix"), path) for path in data.get("paths", [])]
+
+
+@dataclass
+class RouterState:
+    """FRR state of one router, parsed once from vtysh output and shared by all checks."""
+
+    name: str
+    summary: BgpSummary
+    rib: dict
+    rip_active: bool
+    bgp_active: bool
+    running_config: str
+    outputs: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def parse(cls, name, outputs, daemons=("zebra", "ripd", "bgpd")) -> "RouterState":
+        # vtysh prints nothing for a daemon that is not running, so absence must be checked separately.
+        return cls(
+            name,
+            BgpSummary.parse(outputs[SUMMARY]),
+            parse_rib(outputs[RIB]),
+            "ripd" in daemons and "RIP instance not found" not in outputs[RIP],
+            "bgpd" in daemons and "BGP instance not found" not in outputs[BGP],
+            outputs[RUNNING_CONFIG],
+            outputs,
+        )
+
+    def paths(self, next_hop=None) -> list:
+        paths = [path for paths in self.rib.values() for path in paths]
+        return [path for path in paths if next_hop is None or path.next_hop == next_hop]
+
+    def uses(self, command) -> bool:
+        return any(line.strip().startswith(command) for line in self.running_config.splitlines())
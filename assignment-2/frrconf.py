@@ -0,0 +1,160 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class Neighbor:
+    address: str
+    remote_as: Optional[int] = None
+    update_source: Optional[str] = None
+    next_hop_self: bool = False
+    ebgp_multihop: bool = False
+    route_maps: dict = field(default_factory=dict)
+
+
+@dataclass
+class RouteMapEntry:
+    action: str
+    sequence: int
+    matches: list = field(default_factory=list)
+    sets: list = field(default_factory=list)
+
+
+@dataclass
+class ListEntry:
+    """One line of an access-list, prefix-list or community-list: the action and what it matches."""
+
+    action: str
+    value: str
+    exact: bool = False
+    regex: bool = False
+    ge: Optional[int] = None
+    le: Optional[int] = None
+
+
+@dataclass
+class FrrConfig:
+    """The parts of an frr.conf the autotester reasons about without running FRR."""
+
+    bgp_asn: Optional[int] = None
+    router_id: Optional[str] = None
+    neighbors: dict = field(default_factory=dict)
+    networks: list = field(default_factory=list)
+    rip: bool = False
+    rip_networks: list = field(default_factory=list)
+    rip_neighbors: list = field(default_factory=list)
+    route_maps: dict = field(default_factory=dict)
+    access_lists: dict = field(default_factory=dict)
+    prefix_lists: dict = field(default_factory=dict)
+    community_lists: dict = field(default_factory=dict)
+    lines: list = field(default_factory=list)
+
+    def uses(self, command) -> bool:
+        return any(line.startswith(command) for line in self.lines)
+
+    def neighbor(self, address) -> Neighbor:
+        if address not in self.neighbors:
+            self.neighbors[address] = Neighbor(address)
+        return self.neighbors[address]
+
+
+# Statements that leave the current block in FRR, however they are indented. Like vtysh, the parser otherwise keeps
+# a line in the block that is open, since frr.conf does not require indentation and "!" is only a comment.
+GLOBAL_STATEMENTS = {"router", "route-map", "access-list", "interface", "hostname", "line", "log", "ip", "end"}
+
+
+def is_global(words) -> bool:
+    return words[0] in GLOBAL_STATEMENTS or words[:2] == ["bgp", "community-list"]
+
+
+def parse_global(config: FrrConfig, words):
+    """Parses the top-level statements used by routing policy; returns the route-map entry a line opens, if any."""
+    if words[0] == "route-map" and len(words) > 3 and words[3].isdigit():
+        entry = RouteMapEntry(words[2], int(words[3]))
+        config.route_maps.setdefault(words[1], []).append(entry)
+        config.route_maps[words[1]].sort(key=lambda item: item.sequence)
+        return entry
+    if words[0] == "access-list" and len(words) > 3:
+        rest = words[4:] if words[2] == "seq" else words[2:]
+        if len(rest) > 1:
+            config.access_lists.setdefault(words[1], []).append(ListEntry(rest[0], rest[1], "exact-match" in rest))
+    elif words[:2] == ["ip", "prefix-list"] and len(words) > 4:
+        rest = words[5:] if words[3] == "seq" else words[3:]
+        if len(rest) > 1:
+            bounds = dict(zip(rest[2::2], rest[3::2]))
+            ge = int(bounds["ge"]) if "ge" in bounds else None
+            le = int(bounds["le"]) if "le" in bounds else None
+            config.prefix_lists.setdefault(words[2], []).append(ListEntry(rest[0], rest[1], ge=ge, le=le))
+    elif words[1:2] == ["community-list"] and words[0] in ("bgp", "ip") and len(words) > 4:
+        # The standard keyword is optional, expanded lists hold a regular expression instead of communities.
+        rest = words[2:] if words[2] not in ("standard", "expanded") else words[3:]
+        if len(rest) > 2:
+            config.community_lists.setdefault(rest[0], []).append(ListEntry(rest[1], " ".join(rest[2:]), regex=words[2] == "expanded"))
+    return None
+
+
+def parse(text) -> FrrConfig:
+    config = FrrConfig()
+    section = None
+    address_family = False
+    route_map = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("!"):
+            continue
+        config.lines.append(line)
+        words = line.split()
+        if words[:2] == ["router", "bgp"] and len(words) > 2:
+            section = "bgp"
+            address_family = False
+            config.bgp_asn = int(words[2])
+        elif words[:2] == ["router", "rip"]:
+            section = "rip"
+            config.rip = True
+        elif words[0] == "address-family" and section == "bgp":
+            address_family = True
+        elif words[0] == "exit-address-family" or (words[0] == "exit" and address_family):
+            address_family = False
+        elif words[0] == "exit":
+            section = None
+        elif is_global(words):
+            route_map = parse_global(config, words)
+            section = "route-map" if route_map is not None else None
+        elif section == "route-map":
+            arguments = [word for word in words[1:] if word != "exact-match"]
+            if words[0] == "match" and len(arguments) > 1:
+                route_map.matches.append((" ".join(arguments[:-1]), arguments[-1]))
+            elif words[0] == "set" and len(words) > 2:
+                route_map.sets.append((words[1], words[2:]))
+        elif section == "bgp":
+            parse_bgp(config, words)
+        elif section == "rip":
+            if words[0] == "network" and len(words) > 1:
+                config.rip_networks.append(words[1])
+            elif words[0] == "neighbor" and len(words) > 1:
+                config.rip_neighbors.append(words[1])
+    return config
+
+
+def parse_bgp(config: FrrConfig, words):
+    if words[:2] == ["bgp", "router-id"] and len(words) > 2:
+        config.router_id = words[2]
+    elif words[0] == "network" and len(words) > 1:
+        config.networks.append(words[1])
+    elif words[0] == "neighbor" and len(words) > 2:
+        neighbor = config.neighbor(words[1])
+        if words[2] == "remote-as" and len(words) > 3:
+            neighbor.remote_as = int(words[3]) if words[3].isdigit() else words[3]
+        elif words[2] == "update-source" and len(words) > 3:
+            neighbor.update_source = words[3]
+        elif words[2] == "next-hop-self":
+            neighbor.next_hop_self = True
+        elif words[2] == "ebgp-multihop":
+            neighbor.ebgp_multihop = True
+        elif words[2] == "route-map" and len(words) > 4:
+            neighbor.route_maps[words[4]] = words[3]
+
+
+def load(path) -> FrrConfig:
+    with open(path) as f:
+        return parse(f.read())
@@ -0,0 +1,99 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+MAX_HOPS = 32
+
+
+@dataclass
+class Hop:
+    node: str
+    interface: Optional[str] = None
+    via: Optional[str] = None
+
+
+@dataclass
+class Path:
+    """Forwarding path from source to destination, one Hop per node that forwarded the packet.
+
+    status is "reached" when the destination was found, otherwise "unreachable", "loop" or "unknown" when a next
+    hop does not belong to any node in the network.
+    """
+
+    source: str
+    destination: str
+    hops: list = field(default_factory=list)
+    status: str = "unknown"
+    end: Optional[str] = None
+
+    @property
+    def reached(self):
+        return self.status == "reached"
+
+    @property
+    def nodes(self) -> list:
+        return [hop.node for hop in self.hops] + ([self.end] if self.end else [])
+
+    @property
+    def next_hops(self) -> list:
+        return [hop.via for hop in self.hops if hop.via]
+
+    def __str__(self):
+        steps = [f"{hop.node} -[{hop.interface or '?'}{f' via {hop.via}' if hop.via else ''}]->" for hop in self.hops]
+        return " ".join(steps + [self.end or "?"]) + f" ({self.status})\n"
+
+
+def addresses(net) -> dict:
+    """Maps every interface and loopback address in the network to the name of the node holding it."""
+    owners = {}
+    for node in net.hosts:
+        for intf in node.intfList():
+            if intf.IP():
+                owners[intf.IP()] = node.name
+        if getattr(node, "loopback", None):
+            owners[node.loopback.split("/")[0]] = node.name
+    return owners
+
+
+def parse_route_get(output) -> dict:
+    """Parses the first line of "ip route get" into its type and keyword fields, e.g. via and dev."""
+    words = output.strip().split("\n")[0].split()
+    if not words or "unreachable" in output or words[0] in ("blackhole", "prohibit", "throw"):
+        return {"type": "unreachable"}
+    route = {"type": words[0] if words[0] in ("local", "broadcast", "multicast") else "unicast"}
+    for keyword, value in zip(words, words[1:]):
+        if keyword in ("via", "dev", "src"):
+            route[keyword] = value
+    return route
+
+
+def trace(net, source, destination, owners=None) -> Path:
+    """Follows the kernel FIB hop by hop with "ip route get" in each node's namespace.
+
+    Each hop is a single lookup instead of a probe, so the whole path takes milliseconds and never waits on an
+    unresponsive router the way traceroute does.
+    """
+    owners = owners if owners is not None else addresses(net)
+    path = Path(source, destination)
+    node = source
+    visited = set()
+    while len(path.hops) < MAX_HOPS:
+        if node in visited:
+            path.status = "loop"
+            return path
+        visited.add(node)
+        route = parse_route_get(net.getNodeByName(node).cmd(f"ip route get {destination}"))
+        if route["type"] == "local":
+            path.status = "reached"
+            path.end = node
+            return path
+        if route["type"] == "unreachable":
+            path.status = "unreachable"
+            path.end = node
+            return path
+        path.hops.append(Hop(node, route.get("dev"), route.get("via")))
+        next_node = owners.get(route.get("via", destination))
+        if next_node is None:
+            return path
+        node = next_node
+    path.status = "loop"
+    return path
@@ -0,0 +1,101 @@
+import os
+from dataclasses import dataclass, field
+
+import frrconf
+from features import EXPECTED_ASNS, EXPECTED_BGP_NEIGHBORS, EXPECTED_PROTOCOLS, RESTRICTED_COMMANDS
+from mininet.topo import Topo
+from report import CheckResult
+
+
+@dataclass
+class DeclaredIntf:
+    name: str
+    ip: str
+    prefixLen: int
+
+    def __str__(self):
+        return self.name
+
+
+@dataclass
+class DeclaredNode:
+    """A node as declared in a Topo, shaped like the Mininet node the autotester would otherwise inspect."""
+
+    name: str
+    intfs: dict = field(default_factory=dict)
+
+    def addIntf(self, port, name, address):
+        ip, prefixLen = address.split("/") if address and "/" in address else (address, 8)
+        self.intfs[port] = DeclaredIntf(name, ip, int(prefixLen))
+
+
+@dataclass
+class DeclaredNetwork:
+    hosts: list
+
+
+def declared_network(topology: Topo) -> DeclaredNetwork:
+    """Reads nodes, interface names and addresses from a Topo without starting it."""
+    nodes = {}
+    for name in topology.nodes():
+        if topology.isSwitch(name):
+            continue
+        nodes[name] = DeclaredNode(name)
+        info = topology.nodeInfo(name)
+        if "loopback" in info:
+            nodes[name].loopback = info["loopback"]
+
+    ports = []
+    for node1, node2, info in topology.links(withInfo=True):
+        for index, node in ((1, node1), (2, node2)):
+            if node in nodes:
+                port = info[f"port{index}"]
+                intf = info.get(f"intfName{index}") or f"{node}-eth{port}"
+                ports.append((node, port, intf, info.get(f"params{index}", {}).get("ip")))
+
+    # Mininet applies a node's own ip parameter to its default (lowest numbered) interface.
+    default_ports = {}
+    for node, port, _, _ in ports:
+        default_ports[node] = min(port, default_ports.get(node, port))
+    for node, port, intf, ip in ports:
+        if port == default_ports[node] and topology.nodeInfo(node).get("ip"):
+            ip = topology.nodeInfo(node)["ip"]
+        nodes[node].addIntf(port, intf, ip)
+    return DeclaredNetwork(list(nodes.values()))
+
+
+def lint_configs(directory) -> CheckResult:
+    """Checks each router's frr.conf for the expected ASN, neighbours, protocols and restricted commands."""
+    result = CheckResult()
+    configs = {}
+    for entry in EXPECTED_ASNS:
+        path = os.path.join(directory, entry["node"], "frr.conf")
+        if not os.path.isfile(path):
+            result.fail(f'({entry["node"]}) missing {path}')
+            continue
+        configs[entry["node"]] = frrconf.load(path)
+
+    for entry in EXPECTED_ASNS:
+        if entry["node"] in configs and configs[entry["node"]].bgp_asn != int(entry["asn"]):
+            result.fail(f'({entry["node"]}) frr.conf does not configure router bgp {entry["asn"]}')
+    for entry in EXPECTED_BGP_NEIGHBORS:
+        if entry["node"] not in configs:
+            continue
+        neighbors = configs[entry["node"]].neighbors
+        if not all(neighbor in neighbors for neighbor in entry["include"]):
+            result.fail(f'({entry["node"]}) frr.conf should configure neighbours {entry["include"]}')
+        if any(neighbor in neighbors for neighbor in entry.get("exclude", [])):
+            result.note(f'({entry["node"]}) frr.conf should not configure neighbours {entry["exclude"]}')
+    for entry in EXPECTED_PROTOCOLS:
+        if entry["node"] not in configs:
+            continue
+        for protocol in entry["protocols"]:
+            configured = configs[entry["node"]].rip if protocol["type"] == "rip" else configs[entry["node"]].bgp_asn is not None
+            if configured != protocol["status"]:
+                result.fail(f'({entry["node"]}) frr.conf should{" not" if not protocol["status"] else ""} configure {protocol["type"].upper()}')
+    for name, config in configs.items():
+        for entry in RESTRICTED_COMMANDS:
+            expected = name in entry["nodes"]
+            if config.uses(entry["command"]) != expected:
+                result.fail(f'({name}) frr.conf {"does not use" if expected else "uses"} {entry["command"]}')
+    return result
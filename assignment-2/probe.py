@@ -0,0 +1,109 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from mininet.log import output as out
+
+
+def classify_targets(node, targets, script) -> dict:
+    """Runs script once per target concurrently in the node's namespace and collects the "<target> <outcome>" lines."""
+    if not targets:
+        return {}
+    # The subshell keeps the node's interactive shell from printing job control notices.
+    jobs = " ".join(f"(t={target}; {script}) &" for target in targets)
+    outcomes = {}
+    for line in node.cmd(f"( {jobs} wait )").splitlines():
+        words = line.split()
+        if len(words) == 2 and words[0] in targets:
+            outcomes[words[0]] = words[1]
+    return {target: outcomes.get(target, "lost") for target in targets}
+
+
+def ping_targets(node, targets, timeout=1) -> dict:
+    """Pings every (name, ip) target at once from inside the node's namespace and returns reachability by name."""
+    script = f'ping -c 1 -W {timeout} $t >/dev/null 2>&1 && echo "$t 1" || echo "$t 0"'
+    outcomes = classify_targets(node, [ip for _, ip in targets], script)
+    return {name: outcomes[ip] == "1" for name, ip in targets}
+
+
+def probe_targets(node, targets, timeout=1) -> dict:
+    """Pings all targets at once from one namespace, classifying each as success, unreachable or lost."""
+    script = (
+        f'r=$(ping -W {timeout} -w {timeout} -c 1 $t 2>&1); '
+        'case "$r" in *", 0% packet loss"*) s=success;; *"Network is unreachable"*) s=unreachable;; *) s=lost;; esac; '
+        'echo "$t $s"'
+    )
+    return classify_targets(node, targets, script)
+
+
+def lookup_targets(node, targets) -> dict:
+    """Classifies targets with a FIB lookup instead of packets: unreachable when the kernel has no route, else routed.
+
+    This matches what ping reports as "Network is unreachable" without waiting on any timeout.
+    """
+    script = 'r=$(ip route get $t 2>&1); case "$r" in *"Network is unreachable"*) s=unreachable;; *) s=routed;; esac; echo "$t $s"'
+    return classify_targets(node, targets, script)
+
+
+def probe_sources(net, pairs, lookup=False, timeout=1) -> dict:
+    """Probes (source, target) pairs with one batched command per source, running all sources at once.
+
+    Returns the outcome of each pair, from probe_targets or, with lookup, from lookup_targets.
+    """
+    targets = {}
+    for source, target in pairs:
+        targets.setdefault(source, []).append(target)
+
+    def run(source):
+        node = net.getNodeByName(source)
+        if lookup:
+            return source, lookup_targets(node, targets[source])
+        return source, probe_targets(node, targets[source], timeout)
+
+    outcomes = {}
+    if not targets:
+        return outcomes
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        for source, results in pool.map(run, targets):
+            outcomes.update({(source, target): outcome for target, outcome in results.items()})
+    return outcomes
+
+
+def ping_all(net, hosts=None, timeout=1, workers=16, stop_on_failure=False) -> dict:
+    """Parallel replacement for Mininet's pingAll, returning a reachability matrix keyed by (source, destination).
+
+    Every source pings all other hosts concurrently, and up to workers sources run at the same time. With
+    stop_on_failure, sources that have not started yet are skipped once any pair fails, so the matrix may be partial.
+    """
+    hosts = sorted(hosts or net.hosts, key=lambda host: host.name)
+    targets = [(host.name, host.IP()) for host in hosts if host.intfs and host.IP()]
+    out("*** Ping: testing ping reachability\n")
+    matrix = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(hosts))))
+    futures = {
+        pool.submit(ping_targets, host, [target for target in targets if target[0] != host.name], timeout): host.name
+        for host in hosts
+    }
+    try:
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for destination, reachable in future.result().items():
+                    matrix[(futures[future], destination)] = reachable
+            if stop_on_failure and not all(matrix.values()):
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    for host in hosts:
+        row = [destination if reachable else "X" for (source, destination), reachable in sorted(matrix.items()) if source == host.name]
+        if row:
+            out(f"{host.name} -> {' '.join(row)}\n")
+    out(f"*** Results: {loss(matrix):.1f}% dropped\n")
+    return matrix
+
+
+def loss(matrix) -> float:
+    """Percentage of failed pairs, unrounded like the value Mininet's pingAll returns, so any failure is nonzero."""
+    if not matrix:
+        return 0.0
+    return 100 * sum(not reachable for reachable in matrix.values()) / len(matrix)
@@ -0,0 +1,101 @@
+import csv
+import json
+from dataclasses import asdict, dataclass, field
+from xml.etree import ElementTree
+
+from mininet.log import warn
+
+
+@dataclass
+class CheckResult:
+    name: str = ""
+    passed: bool = True
+    failures: list = field(default_factory=list)
+    duration: float = 0.0
+    metrics: dict = field(default_factory=dict)
+    notes: list = field(default_factory=list)
+
+    def fail(self, message):
+        self.passed = False
+        self.failures.append(message)
+        warn(f"{message}\n")
+
+    def note(self, message):
+        """Reports a finding that does not affect the verdict."""
+        self.notes.append(message)
+        warn(f"{message}\n")
+
+    def __bool__(self):
+        return self.passed
+
+
+@dataclass
+class Grade:
+    id: str
+    status: str
+    convergence: float = None
+    checks: dict = field(default_factory=dict)
+    error: str = ""
+    metrics: dict = field(default_factory=dict)
+
+    @property
+    def passed(self):
+        return self.status == "passed"
+
+    @property
+    def duration(self):
+        return sum(check.duration for check in self.checks.values())
+
+    @classmethod
+    def from_dict(cls, data):
+        checks = {name: CheckResult(**check) for name, check in data["checks"].items()}
+        return cls(data["id"], data["status"], data["convergence"], checks, data["error"], data.get("metrics", {}))
+
+
+def write_json(path, grades):
+    with open(path, "w") as f:
+        json.dump([asdict(grade) for grade in grades], f, indent=2)
+
+
+def read_json(path):
+    with open(path) as f:
+        return [Grade.from_dict(data) for data in json.load(f)]
+
+
+def write_csv(path, grades, names):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "status", "convergence"] + names + ["error"])
+        for grade in grades:
+            checks = ["" if name not in grade.checks else int(grade.checks[name].passed) for name in names]
+            convergence = "" if grade.convergence is None else f"{grade.convergence:.3f}"
+            writer.writerow([grade.id, grade.status, convergence] + checks + [grade.error])
+
+
+def write_junit(path, grades):
+    suites = ElementTree.Element("testsuites")
+    for grade in grades:
+        failures = sum(not check.passed for check in grade.checks.values())
+        suite = ElementTree.SubElement(
+            suites,
+            "testsuite",
+            name=grade.id,
+            tests=str(len(grade.checks)),
+            failures=str(failures),
+            errors=str(int(grade.status == "error")),
+            time=f"{grade.duration:.3f}",
+        )
+        if grade.error:
+            ElementTree.SubElement(suite, "error", message=grade.error)
+        for name, check in grade.checks.items():
+            case = ElementTree.SubElement(suite, "testcase", classname=grade.id, name=name, time=f"{check.duration:.3f}")
+            if check.metrics:
+                properties = ElementTree.SubElement(case, "properties")
+                for key, value in check.metrics.items():
+                    ElementTree.SubElement(properties, "property", name=key, value=str(value))
+            if not check.passed:
+                failure = ElementTree.SubElement(case, "failure", message=f"{len(check.failures)} assertion(s) failed")
+                failure.text = "\n".join(check.failures)
+            if check.notes:
+                ElementTree.SubElement(case, "system-out").text = "\n".join(check.notes)
+    ElementTree.ElementTree(suites).write(path, encoding="utf-8", xml_declaration=True)
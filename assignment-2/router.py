@@ -1,9 +1,12 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from time import monotonic, sleep
 
 from mininet.node import Node
 
 DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+TMPFS_DIRECTORY = "/dev/shm"
 
 
 class Router(Node):
@@ -33,6 +36,9 @@ class Router(Node):
 
 
 class FRRRouter(Router):
+    daemons = ["zebra", "ripd", "bgpd"]
+    logSinks = ["file", "tmpfs", "syslog", "none"]
+
     def __init__(self, name, **params):
         if "privateDirs" not in params:
             params["privateDirs"] = [
@@ -44,23 +50,146 @@ class FRRRouter(Router):
 
     def config(self, **params):
         super(FRRRouter, self).config(**params)
+        self.startupTime = None
+        self.daemons = params.get("daemons", FRRRouter.daemons)
+        self.logLevel = params.get("logLevel", "debugging")
+        self.logSink = params.get("logSink", "file")
+        if self.logSink not in self.logSinks:
+            raise ValueError(f"({self.name}) unknown log sink {self.logSink}, expected one of {self.logSinks}")
+
+        self.installConfig()
 
+        # With deferStart the daemons are launched later, usually for all routers at once by start_routers().
+        if not params.get("deferStart", False):
+            self.startDaemons()
+
+    def installConfig(self):
         with self.routerContext():
             self.cmd("install -m 640 -o frr -g frr frr.conf /etc/frr")
             self.cmd(f'echo "hostname {self.name}" > /etc/frr/vtysh.conf')
-            self.cmd("/usr/lib/frr/zebra -f /etc/frr/frr.conf --log file:./zebra.log --log-level debugging -d")
-            self.cmd("/usr/lib/frr/ripd -f /etc/frr/frr.conf --log file:./ripd.log --log-level debugging -d")
-            self.cmd("/usr/lib/frr/bgpd -f /etc/frr/frr.conf --log file:./bgpd.log --log-level debugging -d")
 
-    def terminate(self):
+    def reload(self, daemons=None, timeout=10):
+        """Restarts the daemons on the frr.conf currently found under DIRECTORY, discarding all BGP and RIP state.
+
+        Returns whether the router came back up within timeout seconds.
+        """
+        self.stopDaemons()
+        # Routes from daemons that had to be killed outlive them in the kernel.
+        self.cmd("ip route flush proto bgp ; ip route flush proto rip")
+        if daemons is not None:
+            self.daemons = daemons
+        self.installConfig()
+        return self.startDaemons(timeout)
+
+    def logDirectory(self):
+        """Where the tmpfs sink writes, unique to this grading process so parallel gradings never share a log."""
+        return f"{TMPFS_DIRECTORY}/frr-{os.getpid()}-{self.name}"
+
+    def logOptions(self, daemon):
+        if self.logSink == "none":
+            return ""
+        target = {
+            "file": f"file:./{daemon}.log",
+            "tmpfs": f"file:{self.logDirectory()}/{daemon}.log",
+            "syslog": "syslog",
+        }[self.logSink]
+        return f" --log {target} --log-level {self.logLevel}"
+
+    def daemonCommand(self, daemon):
+        return f"/usr/lib/frr/{daemon} -f /etc/frr/frr.conf{self.logOptions(daemon)} -d"
+
+    def daemonsReady(self):
+        checks = " && ".join(f"test -s /var/run/frr/{daemon}.pid -a -S /var/run/frr/{daemon}.vty" for daemon in self.daemons)
+        return self.cmd(f"{checks} && echo ready").strip().endswith("ready")
+
+    def startDaemons(self, timeout=10, interval=0.05):
+        """Launches all daemons and waits until each has written its pidfile and opened its vty socket.
+
+        Returns whether the router came up within timeout seconds and records the time taken in startupTime.
+        """
+        start = monotonic()
+        self.startupTime = None
+        if self.logSink == "tmpfs":
+            self.cmd(f"install -d -m 750 -o frr -g frr {self.logDirectory()}")
         with self.routerContext():
-            self.cmd("kill -9 `cat /var/run/frr/zebra.pid`")
-            self.cmd("kill -9 `cat /var/run/frr/ripd.pid`")
-            self.cmd("kill -9 `cat /var/run/frr/bgpd.pid`")
+            self.cmd(" ; ".join(self.daemonCommand(daemon) for daemon in self.daemons))
+        while not self.daemonsReady():
+            if monotonic() - start > timeout:
+                return False
+            sleep(interval)
+        self.startupTime = monotonic() - start
+        return True
+
+    def daemonPids(self):
+        return self.cmd("cat /var/run/frr/*.pid 2>/dev/null").split()
+
+    def livePids(self, pids):
+        if not pids:
+            return []
+        return self.cmd(f"for pid in {' '.join(pids)}; do kill -0 $pid 2>/dev/null && echo $pid; done").split()
+
+    def stopDaemons(self, timeout=5, interval=0.05):
+        """Stops all daemons with SIGTERM, escalating to SIGKILL for any still running after timeout seconds.
+
+        Returns whether the router is clean afterwards, i.e. no daemon is left running.
+        """
+        pids = self.daemonPids()
+        if pids:
+            self.cmd(f"kill -TERM {' '.join(pids)} 2>/dev/null")
+        start = monotonic()
+        remaining = self.livePids(pids)
+        while remaining and monotonic() - start < timeout:
+            sleep(interval)
+            remaining = self.livePids(remaining)
+        if remaining:
+            self.cmd(f"kill -9 {' '.join(remaining)} 2>/dev/null")
+            sleep(interval)
+            remaining = self.livePids(remaining)
+        self.cmd("rm -f /var/run/frr/*.pid /var/run/frr/*.vty /var/run/frr/zserv.api")
+        if self.logSink == "tmpfs":
+            # RAM-backed logs would otherwise pile up across warm and batch runs.
+            self.cmd(f"rm -rf {self.logDirectory()}")
+        return not remaining
 
+    def terminate(self):
+        self.stopDaemons()
         super(FRRRouter, self).terminate()
 
 
+def start_routers(routers, timeout=10):
+    """Starts the daemons of all given FRR routers concurrently and returns each router's startup time.
+
+    Routers that did not come up within timeout seconds are reported with a startup time of None.
+    """
+    if not routers:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(routers)) as pool:
+        list(pool.map(lambda router: router.startDaemons(timeout), routers))
+    return {router.name: router.startupTime for router in routers}
+
+
+def reload_routers(routers, daemons=None, timeout=10):
+    """Reloads the configuration of all given FRR routers concurrently and returns each router's startup time.
+
+    daemons optionally maps router names to the daemons they should run after the reload.
+    """
+    if not routers:
+        return {}
+    daemons = daemons or {}
+    with ThreadPoolExecutor(max_workers=len(routers)) as pool:
+        list(pool.map(lambda router: router.reload(daemons.get(router.name), timeout), routers))
+    return {router.name: router.startupTime for router in routers}
+
+
+def stop_routers(routers, timeout=5):
+    """Stops the daemons of all given FRR routers concurrently and returns whether each router ended up clean."""
+    if not routers:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(routers)) as pool:
+        clean = list(pool.map(lambda router: router.stopDaemons(timeout), routers))
+    return {router.name: result for router, result in zip(routers, clean)}
+
+
 class BIRDRouter(Router):
     def __init__(self, name, **params):
         if "privateDirs" not in params:
@@ -0,0 +1,697 @@
+import os
+import re
+from dataclasses import dataclass, field, replace
+from ipaddress import ip_address, ip_interface, ip_network
+from typing import Optional
+
+import frr
+import frrconf
+from features import (
+    EXPECTED_ASNS,
+    EXPECTED_BGP_NEIGHBORS,
+    EXPECTED_PING_RESULTS,
+    EXPECTED_PROTOCOLS,
+    RESTRICTED_COMMANDS,
+)
+from mininet.topo import Topo
+from paths import Hop, Path
+from preflight import declared_network
+from report import CheckResult
+
+RIP_INFINITY = 16
+# Administrative distances zebra uses to pick between protocols for the same prefix.
+DISTANCES = {"connected": 0, "static": 1, "ebgp": 20, "rip": 120, "ibgp": 200}
+LOCAL_WEIGHT = 32768
+DEFAULT_LOCAL_PREFERENCE = 100
+MAX_ROUNDS = 64
+
+
+@dataclass
+class Interface:
+    name: str
+    address: object
+    up: bool = True
+
+
+@dataclass
+class Node:
+    name: str
+    interfaces: dict = field(default_factory=dict)
+    loopback: Optional[object] = None
+    gateway: Optional[str] = None
+    config: Optional[frrconf.FrrConfig] = None
+
+    @property
+    def addresses(self) -> list:
+        addresses = [str(intf.address.ip) for intf in self.interfaces.values()]
+        return addresses + ([str(self.loopback.ip)] if self.loopback else [])
+
+
+@dataclass
+class Route:
+    """A kernel route, with the next hop already resolved to a directly connected gateway."""
+
+    prefix: object
+    protocol: str
+    interface: Optional[str] = None
+    next_hop: Optional[str] = None
+    metric: int = 0
+
+
+@dataclass
+class BgpRoute:
+    prefix: object
+    next_hop: str
+    as_path: tuple = ()
+    local_preference: Optional[int] = None
+    metric: Optional[int] = None
+    communities: tuple = ()
+    weight: int = 0
+    peer: Optional[str] = None
+    peer_router_id: str = "0.0.0.0"
+    ebgp: bool = False
+    ibgp: bool = False
+    best: bool = False
+
+    def path(self) -> frr.BgpPath:
+        """This route as the autotester's parsed vtysh view of it."""
+        community = " ".join(self.communities) or None
+        return frr.BgpPath(str(self.prefix), self.next_hop, self.metric, self.local_preference, community, self.best)
+
+
+@dataclass
+class Session:
+    node: str
+    peer: str
+    address: str
+    local_address: str
+    ebgp: bool
+    neighbor: frrconf.Neighbor
+
+
+def parse_prefix(value):
+    return ip_network(value, strict=False)
+
+
+def matches_access_list(entries, prefix) -> bool:
+    for entry in entries:
+        if entry.value == "any":
+            return entry.action == "permit"
+        network = parse_prefix(entry.value)
+        if prefix == network if entry.exact else prefix.subnet_of(network):
+            return entry.action == "permit"
+    return False
+
+
+def matches_prefix_list(entries, prefix) -> bool:
+    for entry in entries:
+        if entry.value == "any":
+            return entry.action == "permit"
+        network = parse_prefix(entry.value)
+        low = entry.ge or network.prefixlen
+        high = entry.le or (32 if entry.ge else network.prefixlen)
+        if prefix.subnet_of(network) and low <= prefix.prefixlen <= high:
+            return entry.action == "permit"
+    return False
+
+
+def matches_community_list(entries, communities) -> bool:
+    text = " ".join(communities)
+    for entry in entries:
+        matched = re.search(entry.value, text) is not None if entry.regex else set(entry.value.split()) <= set(communities)
+        if matched:
+            return entry.action == "permit"
+    return False
+
+
+def apply_route_map(config: frrconf.FrrConfig, name, route: BgpRoute) -> Optional[BgpRoute]:
+    """Runs route through the named route-map, returning the rewritten route or None if it is denied.
+
+    Like FRR, a route-map that is referenced but not defined denies everything, as does falling off its end.
+    """
+    for entry in config.route_maps.get(name, []):
+        if not all(matches(config, kind, value, route) for kind, value in entry.matches):
+            continue
+        if entry.action != "permit":
+            return None
+        for kind, arguments in entry.sets:
+            route = set_attribute(route, kind, arguments)
+        return route
+    return None
+
+
+def matches(config: frrconf.FrrConfig, kind, value, route: BgpRoute) -> bool:
+    if kind == "community":
+        return matches_community_list(config.community_lists.get(value, []), route.communities)
+    if kind == "ip address":
+        return matches_access_list(config.access_lists.get(value, []), route.prefix)
+    if kind == "ip address prefix-list":
+        return matches_prefix_list(config.prefix_lists.get(value, []), route.prefix)
+    # Unsupported match clauses never match, so the simulation errs towards denying.
+    return False
+
+
+def set_attribute(route: BgpRoute, kind, arguments) -> BgpRoute:
+    if kind == "metric" and arguments[0].isdigit():
+        return replace(route, metric=int(arguments[0]))
+    if kind == "local-preference" and arguments[0].isdigit():
+        return replace(route, local_preference=int(arguments[0]))
+    if kind == "weight" and arguments[0].isdigit():
+        return replace(route, weight=int(arguments[0]))
+    if kind == "community":
+        if arguments == ["none"]:
+            return replace(route, communities=())
+        values = tuple(argument for argument in arguments if argument != "additive")
+        communities = route.communities + values if "additive" in arguments else values
+        return replace(route, communities=tuple(dict.fromkeys(communities)))
+    if kind == "as-path" and arguments[:1] == ["prepend"]:
+        return replace(route, as_path=tuple(int(asn) for asn in arguments[1:] if asn.isdigit()) + route.as_path)
+    return route
+
+
+class Simulation:
+    """Computes converged RIP and BGP state and the resulting FIBs from a topology and its frr.conf files.
+
+    Models RIP network and neighbor statements, BGP sessions (including update-source, next-hop-self and eBGP
+    reachability), network statements, route-maps with access-list, prefix-list and community-list matches, and
+    FRR's best-path order. Links listed in failed, as (node, node) pairs, are down.
+
+    History is the simulation this state converged from, e.g. the link-down state when a link is restored. Paths it
+    already held count as older, for FRR's preference for the oldest of otherwise equal eBGP paths. Without history,
+    path age is unknown and the tie falls through to router-id, as with compare-routerid.
+    """
+
+    def __init__(self, nodes: dict, links: list, failed=(), history=None):
+        self.nodes = nodes
+        self.links = links
+        self.history = history
+        for (name1, intf1), (name2, intf2) in links:
+            if (name1, name2) in failed or (name2, name1) in failed:
+                nodes[name1].interfaces[intf1].up = False
+                nodes[name2].interfaces[intf2].up = False
+        self.owners = {address: node.name for node in nodes.values() for address in node.addresses}
+        self.rip = {}
+        self.bgp = {}
+        self.sessions = []
+        self.fibs = {}
+        self.run()
+
+    @classmethod
+    def from_topology(cls, topology: Topo, directory, failed=(), history=None) -> "Simulation":
+        nodes = {}
+        for declared in declared_network(topology).hosts:
+            node = Node(declared.name)
+            for _, intf in sorted(declared.intfs.items()):
+                if intf.ip:
+                    node.interfaces[intf.name] = Interface(intf.name, ip_interface(f"{intf.ip}/{intf.prefixLen}"))
+            if hasattr(declared, "loopback"):
+                node.loopback = ip_interface(declared.loopback)
+            route = topology.nodeInfo(declared.name).get("defaultRoute", "")
+            if route.startswith("via "):
+                node.gateway = route.split()[1]
+            path = os.path.join(directory, declared.name, "frr.conf")
+            if os.path.isfile(path):
+                node.config = frrconf.load(path)
+            nodes[node.name] = node
+
+        links = []
+        for node1, node2, info in topology.links(withInfo=True):
+            if node1 in nodes and node2 in nodes:
+                names = [info.get(f"intfName{index}") or f"{node}-eth{info[f'port{index}']}" for index, node in ((1, node1), (2, node2))]
+                links.append(((node1, names[0]), (node2, names[1])))
+        return cls(nodes, links, failed, history)
+
+    def run(self):
+        self.run_rip()
+        self.establish_sessions()
+        self.run_bgp()
+        self.fibs = {name: self.build_fib(name) for name in self.nodes}
+
+    # Connected routes and lookups
+
+    def connected(self, name) -> list:
+        node = self.nodes[name]
+        routes = [Route(intf.address.network, "connected", intf.name) for intf in node.interfaces.values() if intf.up]
+        if node.loopback:
+            routes.append(Route(node.loopback.network, "connected", "lo"))
+        return routes
+
+    def igp(self, name) -> list:
+        """Connected and RIP routes, the table BGP resolves next hops and sessions against."""
+        return self.connected(name) + list(self.rip.get(name, {}).values())
+
+    @staticmethod
+    def longest_match(routes, address) -> Optional[Route]:
+        address = ip_address(address)
+        candidates = [route for route in routes if address in route.prefix]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda route: (-route.prefix.prefixlen, DISTANCES[route.protocol]))
+
+    def interface_address(self, name, intf) -> Optional[str]:
+        node = self.nodes[name]
+        if intf == "lo":
+            return str(node.loopback.ip) if node.loopback else None
+        return str(node.interfaces[intf].address.ip) if intf in node.interfaces else None
+
+    def peer_on_link(self, name, intf, address) -> Optional[str]:
+        owner = self.owners.get(address)
+        if owner is None:
+            return None
+        for (name1, intf1), (name2, intf2) in self.links:
+            for (a, a_intf), (b, b_intf) in (((name1, intf1), (name2, intf2)), ((name2, intf2), (name1, intf1))):
+                if a == name and a_intf == intf and b == owner and self.nodes[a].interfaces[a_intf].up:
+                    return owner if address == str(self.nodes[b].interfaces[b_intf].address.ip) else None
+        return None
+
+    # RIP
+
+    def rip_enabled(self, name, intf) -> bool:
+        config = self.nodes[name].config
+        if config is None or not config.rip:
+            return False
+        address = self.interface_address(name, intf)
+        for network in config.rip_networks:
+            if network == intf:
+                return True
+            try:
+                if address and ip_address(address) in parse_prefix(network):
+                    return True
+            except ValueError:
+                continue
+        return False
+
+    def rip_adjacencies(self) -> list:
+        """Directed (sender, sender address, receiver, receiver interface) pairs RIP updates flow over.
+
+        ripd sends on enabled interfaces and to configured neighbours, and accepts packets arriving on enabled
+        interfaces or from configured neighbours.
+        """
+        adjacencies = []
+        for (name1, intf1), (name2, intf2) in self.links:
+            node1, node2 = self.nodes[name1], self.nodes[name2]
+            if not node1.interfaces[intf1].up or node1.config is None or node2.config is None:
+                continue
+            address1, address2 = self.interface_address(name1, intf1), self.interface_address(name2, intf2)
+            for a, a_intf, a_address, b, b_intf, b_address in (
+                (name1, intf1, address1, name2, intf2, address2),
+                (name2, intf2, address2, name1, intf1, address1),
+            ):
+                config_a, config_b = self.nodes[a].config, self.nodes[b].config
+                if not (config_a.rip and config_b.rip):
+                    continue
+                sends = self.rip_enabled(a, a_intf) or b_address in config_a.rip_neighbors
+                accepts = self.rip_enabled(b, b_intf) or a_address in config_b.rip_neighbors
+                if sends and accepts:
+                    adjacencies.append((a, a_address, b, b_intf))
+        return adjacencies
+
+    def run_rip(self):
+        tables = {}
+        for name in self.nodes:
+            tables[name] = {}
+            for route in self.connected(name):
+                if self.rip_enabled(name, route.interface):
+                    tables[name][route.prefix] = Route(route.prefix, "connected", route.interface, None, 1)
+
+        adjacencies = self.rip_adjacencies()
+        changed = True
+        while changed:
+            changed = False
+            for sender, address, receiver, intf in adjacencies:
+                connected = {route.prefix for route in self.connected(receiver)}
+                for prefix, route in list(tables[sender].items()):
+                    metric = route.metric + 1
+                    if metric >= RIP_INFINITY or prefix in connected:
+                        continue
+                    current = tables[receiver].get(prefix)
+                    if current is None or metric < current.metric:
+                        tables[receiver][prefix] = Route(prefix, "rip", intf, address, metric)
+                        changed = True
+        self.rip = {name: {prefix: route for prefix, route in table.items() if route.protocol == "rip"} for name, table in tables.items()}
+
+    # BGP
+
+    def router_id(self, name) -> str:
+        node = self.nodes[name]
+        if node.config.router_id:
+            return node.config.router_id
+        if node.loopback:
+            return str(node.loopback.ip)
+        return max(node.addresses, key=ip_address, default="0.0.0.0")
+
+    def source_address(self, name, neighbor: frrconf.Neighbor) -> Optional[str]:
+        if neighbor.update_source:
+            try:
+                return str(ip_address(neighbor.update_source))
+            except ValueError:
+                return self.interface_address(name, neighbor.update_source)
+        route = self.longest_match(self.igp(name), neighbor.address)
+        return self.interface_address(name, route.interface) if route else None
+
+    def reachable(self, name, address, direct) -> bool:
+        route = self.longest_match(self.connected(name) if direct else self.igp(name), address)
+        return route is not None and (not direct or route.interface != "lo")
+
+    def half_session(self, name, neighbor: frrconf.Neighbor):
+        """Returns (peer, local address, eBGP) if name's side of a session can come up, else None."""
+        config = self.nodes[name].config
+        peer = self.owners.get(neighbor.address)
+        if peer is None or peer == name or self.nodes[peer].config is None or self.nodes[peer].config.bgp_asn is None:
+            return None
+        peer_asn = self.nodes[peer].config.bgp_asn
+        remote_as = neighbor.remote_as
+        if remote_as == "internal":
+            remote_as = config.bgp_asn
+        elif remote_as == "external":
+            remote_as = peer_asn if peer_asn != config.bgp_asn else None
+        if remote_as != peer_asn:
+            return None
+        ebgp = peer_asn != config.bgp_asn
+        local_address = self.source_address(name, neighbor)
+        if local_address is None or not self.reachable(name, neighbor.address, ebgp and not neighbor.ebgp_multihop):
+            return None
+        return peer, local_address, ebgp
+
+    def establish_sessions(self):
+        halves = {}
+        for name, node in self.nodes.items():
+            if node.config is None or node.config.bgp_asn is None:
+                continue
+            for neighbor in node.config.neighbors.values():
+                half = self.half_session(name, neighbor)
+                if half is not None:
+                    halves[(name, neighbor.address)] = half
+        for (name, address), (peer, local_address, ebgp) in halves.items():
+            # Both ends must point at each other's source address for the TCP session to be accepted.
+            other = halves.get((peer, local_address))
+            if other is not None and other[0] == name and other[1] == address:
+                neighbor = self.nodes[name].config.neighbors[address]
+                self.sessions.append(Session(name, peer, address, local_address, ebgp, neighbor))
+
+    def established(self, name) -> dict:
+        """BGP peer addresses of name and whether each session is established, like show bgp summary."""
+        up = {session.address for session in self.sessions if session.node == name}
+        config = self.nodes[name].config
+        return {address: address in up for address in (config.neighbors if config else {})}
+
+    def originate(self, name) -> list:
+        config = self.nodes[name].config
+        routes = []
+        igp = self.igp(name)
+        for network in config.networks:
+            prefix = parse_prefix(network)
+            # FRR's default import check: a network is only announced while the router has a route for it.
+            route = next((route for route in igp if route.prefix == prefix), None)
+            if route is not None:
+                metric = route.metric if route.protocol == "rip" else 0
+                routes.append(BgpRoute(prefix, "0.0.0.0", metric=metric, weight=LOCAL_WEIGHT, peer_router_id=self.router_id(name)))
+        return routes
+
+    def export(self, session: Session, route: BgpRoute) -> Optional[BgpRoute]:
+        """Route as advertised over session, after next hop, AS path and attribute rules and the outbound route-map."""
+        node_config = self.nodes[session.node].config
+        local = route.peer is None
+        if route.ibgp and not session.ebgp:
+            return None
+        if route.peer is not None and self.owners.get(route.peer) == session.peer:
+            return None
+        if session.ebgp:
+            # MED does not leave the AS that received it, unless this router originated the route.
+            advertised = replace(
+                route,
+                next_hop=session.local_address,
+                as_path=(node_config.bgp_asn,) + route.as_path,
+                local_preference=None,
+                metric=route.metric if local else None,
+            )
+        else:
+            next_hop = session.local_address if local or session.neighbor.next_hop_self else route.next_hop
+            local_preference = route.local_preference if route.local_preference is not None else DEFAULT_LOCAL_PREFERENCE
+            advertised = replace(route, next_hop=next_hop, local_preference=local_preference)
+        advertised = replace(advertised, weight=0, best=False)
+        if "out" in session.neighbor.route_maps:
+            return apply_route_map(node_config, session.neighbor.route_maps["out"], advertised)
+        return advertised
+
+    def receive(self, session: Session, route: BgpRoute) -> Optional[BgpRoute]:
+        """Route as received by session.peer, after loop detection and its inbound route-map."""
+        config = self.nodes[session.peer].config
+        if config.bgp_asn in route.as_path:
+            return None
+        neighbor = config.neighbors.get(session.local_address)
+        received = replace(
+            route,
+            peer=session.local_address,
+            peer_router_id=self.router_id(session.node),
+            ebgp=session.ebgp,
+            ibgp=not session.ebgp,
+        )
+        if neighbor is not None and "in" in neighbor.route_maps:
+            return apply_route_map(config, neighbor.route_maps["in"], received)
+        return received
+
+    def igp_metric(self, name, next_hop) -> Optional[int]:
+        if next_hop == "0.0.0.0":
+            return 0
+        route = self.longest_match(self.igp(name), next_hop)
+        return None if route is None else route.metric
+
+    def newer(self, name, route: BgpRoute) -> bool:
+        """Whether an eBGP path was learned after the history state, i.e. is not among the paths it held."""
+        if self.history is None or not route.ebgp:
+            return False
+        held = self.history.bgp.get(name, {}).get(route.prefix, [])
+        return not any(path.peer == route.peer for path in held)
+
+    def select(self, name, routes) -> dict:
+        """Groups routes by prefix and marks the best path of each, following FRR's decision process."""
+        by_prefix = {}
+        for route in routes:
+            by_prefix.setdefault(route.prefix, []).append(replace(route, best=False))
+        for prefix, candidates in by_prefix.items():
+            valid = [route for route in candidates if self.igp_metric(name, route.next_hop) is not None]
+            if not valid:
+                continue
+
+            def key(route):
+                local_preference = route.local_preference if route.local_preference is not None else DEFAULT_LOCAL_PREFERENCE
+                return (
+                    -route.weight,
+                    -local_preference,
+                    route.peer is not None,
+                    len(route.as_path),
+                    route.metric or 0,
+                    not route.ebgp if route.peer is not None else False,
+                    self.igp_metric(name, route.next_hop),
+                    self.newer(name, route),
+                    ip_address(route.peer_router_id),
+                    ip_address(route.peer or "0.0.0.0"),
+                )
+
+            # MED is only compared between paths from the same neighbouring AS, so it is dropped from the key
+            # whenever the candidates came from different ASes.
+            first_as = {route.as_path[:1] for route in valid}
+            best = min(valid, key=(lambda route: key(route)[:4] + key(route)[5:]) if len(first_as) > 1 else key)
+            best.best = True
+        return by_prefix
+
+    def run_bgp(self):
+        speakers = [name for name, node in self.nodes.items() if node.config is not None and node.config.bgp_asn is not None]
+        local = {name: self.originate(name) for name in speakers}
+        self.bgp = {name: self.select(name, local[name]) for name in speakers}
+        for _ in range(MAX_ROUNDS):
+            received = {name: list(local[name]) for name in speakers}
+            for session in self.sessions:
+                for paths in self.bgp[session.node].values():
+                    for route in paths:
+                        if not route.best:
+                            continue
+                        advertised = self.export(session, route)
+                        if advertised is not None:
+                            accepted = self.receive(session, advertised)
+                            if accepted is not None:
+                                received[session.peer].append(accepted)
+            tables = {name: self.select(name, received[name]) for name in speakers}
+            if tables == self.bgp:
+                break
+            self.bgp = tables
+
+    def bgp_paths(self, name, prefix=None) -> list:
+        """All BGP paths name holds, or those for one prefix, as the autotester's parsed view of them."""
+        paths = [route for routes in self.bgp.get(name, {}).values() for route in routes]
+        return [route.path() for route in paths if prefix is None or route.prefix == parse_prefix(prefix)]
+
+    # Forwarding
+
+    def build_fib(self, name) -> list:
+        routes = {}
+
+        def install(route):
+            current = routes.get(route.prefix)
+            if current is None or DISTANCES[route.protocol] < DISTANCES[current.protocol]:
+                routes[route.prefix] = route
+
+        for route in self.igp(name):
+            install(route)
+        node = self.nodes[name]
+        if node.gateway:
+            gateway = self.longest_match(self.connected(name), node.gateway)
+            if gateway is not None:
+                install(Route(ip_network("0.0.0.0/0"), "static", gateway.interface, node.gateway))
+        for paths in self.bgp.get(name, {}).values():
+            for route in paths:
+                if not route.best or route.peer is None:
+                    continue
+                # Recursive next hops are installed through the IGP route that resolves them.
+                via = self.longest_match(self.igp(name), route.next_hop)
+                if via is not None:
+                    next_hop = route.next_hop if via.protocol == "connected" else via.next_hop
+                    install(Route(route.prefix, "ebgp" if route.ebgp else "ibgp", via.interface, next_hop))
+        return list(routes.values())
+
+    def lookup(self, name, address) -> Optional[Route]:
+        return self.longest_match(self.fibs[name], address)
+
+    def source(self, name, destination) -> Optional[str]:
+        """The address name sends from towards destination, as the kernel picks it from the outgoing interface."""
+        if destination in self.nodes[name].addresses:
+            return destination
+        route = self.lookup(name, destination)
+        return self.interface_address(name, route.interface) if route else None
+
+    def trace(self, source, destination) -> Path:
+        """Forwarding path from source to destination through the simulated FIBs, shaped like paths.trace()."""
+        path = Path(source, destination)
+        name = source
+        visited = set()
+        while name not in visited:
+            visited.add(name)
+            if destination in self.nodes[name].addresses:
+                path.status = "reached"
+                path.end = name
+                return path
+            route = self.lookup(name, destination)
+            if route is None:
+                path.status = "unreachable"
+                path.end = name
+                return path
+            path.hops.append(Hop(name, route.interface, route.next_hop))
+            next_name = self.peer_on_link(name, route.interface, route.next_hop or destination)
+            if next_name is None:
+                return path
+            name = next_name
+        path.status = "loop"
+        return path
+
+    def ping(self, source, destination) -> bool:
+        """Whether an echo request reaches destination and its reply finds the way back."""
+        address = self.source(source, destination)
+        if address is None or not self.trace(source, destination).reached:
+            return False
+        return self.trace(self.owners[destination], address).reached
+
+    def default_address(self, name) -> Optional[str]:
+        """The address Mininet reports as the node's IP, i.e. that of its lowest numbered interface."""
+        interfaces = list(self.nodes[name].interfaces.values())
+        return str(interfaces[0].address.ip) if interfaces else None
+
+    def ping_all(self) -> bool:
+        targets = [(name, self.default_address(name)) for name in sorted(self.nodes) if self.default_address(name)]
+        return all(self.ping(source, address) for source in sorted(self.nodes) for name, address in targets if name != source)
+
+
+def predict(topology: Topo, directory) -> dict:
+    """Predicts the verdict of each live check from the submission's topology and frr.conf files alone.
+
+    Returns CheckResults keyed by check name. Protocol, ASN, neighbour and restricted command checks are read off the
+    configuration; connectivity, fault tolerance, metric and route checks come from the simulated routing state.
+    """
+    simulation = Simulation.from_topology(topology, directory)
+    failed = Simulation.from_topology(topology, directory, failed=[("r110", "r410")])
+    # After the link comes back up, paths that survived the outage are older than the ones relearned over r110.
+    restored = Simulation.from_topology(topology, directory, history=failed)
+    nodes = simulation.nodes
+    checks = {name: CheckResult(name) for name in [
+        "Protocol check", "ASN check", "Connectivity check", "Neighbour check",
+        "Fault tolerance check", "Metric value check", "Route check", "Restricted commands check",
+    ]}
+
+    def config(name):
+        return nodes[name].config if name in nodes and nodes[name].config else frrconf.FrrConfig()
+
+    for entry in EXPECTED_PROTOCOLS:
+        for protocol in entry["protocols"]:
+            active = config(entry["node"]).rip if protocol["type"] == "rip" else config(entry["node"]).bgp_asn is not None
+            if active != protocol["status"]:
+                checks["Protocol check"].fail(f'({entry["node"]}) {protocol["type"].upper()} should{" not" if not protocol["status"] else ""} be active')
+
+    for entry in EXPECTED_ASNS:
+        if config(entry["node"]).bgp_asn != int(entry["asn"]):
+            checks["ASN check"].fail(f'({entry["node"]}) incorrect ASN')
+
+    result = checks["Connectivity check"]
+    if not simulation.ping_all():
+        result.fail("all nodes should be able to ping each other")
+    for entry in EXPECTED_PING_RESULTS["success"]:
+        if not simulation.ping(entry["source"], entry["target"]):
+            result.fail(f'({entry["source"]}) failed to ping {entry["target"]}')
+    for entry in EXPECTED_PING_RESULTS["failure"]:
+        if simulation.lookup(entry["source"], entry["target"]) is not None:
+            result.fail(f'({entry["source"]}) should fail to ping {entry["target"]}')
+
+    for entry in EXPECTED_BGP_NEIGHBORS:
+        peers = config(entry["node"]).neighbors
+        if not all(neighbor in peers for neighbor in entry["include"]):
+            checks["Neighbour check"].fail(f'({entry["node"]}) should be neighbours with {entry["include"]}')
+        if any(neighbor in peers for neighbor in entry.get("exclude", [])):
+            checks["Neighbour check"].note(f'({entry["node"]}) should not be neighbours with {entry["exclude"]}')
+
+    result = checks["Fault tolerance check"]
+    if "172.17.3.0" not in simulation.trace("r410", "192.168.1.1").next_hops:
+        result.fail("(r410) route to r120 does not pass through r110")
+    if "172.17.4.0" not in failed.trace("r410", "192.168.1.1").next_hops:
+        result.fail("(r410) route to r120 does not pass through r130 [link down]")
+    if not failed.ping_all():
+        result.fail("failed to maintain connectivity [link down]")
+    if "172.17.3.0" not in restored.trace("r410", "192.168.1.1").next_hops:
+        result.fail("(r410) route to r120 does not pass through r110 [link up]")
+    if not restored.ping_all():
+        result.fail("failed to maintain connectivity [link up]")
+
+    for node, next_hop, expected, message in [
+        ("r410", "172.17.3.0", False, "(r410) received route with unset metric from r110"),
+        ("r410", "172.17.4.0", False, "(r410) received route with unset metric from r130"),
+        ("r210", "172.17.1.0", True, "(r210) received route with set metric from r110"),
+        ("r310", "172.17.2.0", True, "(r310) received route with set metric from r130"),
+    ]:
+        unset = any(path.metric == 0 for path in simulation.bgp_paths(node) if path.next_hop == next_hop)
+        if unset != expected:
+            checks["Metric value check"].fail(message)
+
+    result = checks["Route check"]
+    for node, subnet, next_hop, community, local_preference in [
+        ("r110", "10.4.1.0/25", "172.17.3.1", "400:300", 300),
+        ("r110", "10.4.1.128/25", "172.17.3.1", "400:100", 100),
+        ("r130", "10.4.1.0/25", "172.17.4.1", "400:100", 100),
+        ("r130", "10.4.1.128/25", "172.17.4.1", "400:300", 300),
+    ]:
+        route = next((path for path in simulation.bgp_paths(node, subnet) if path.next_hop == next_hop), None)
+        if route is None:
+            result.fail(f"({node}) no route received for {subnet} from {next_hop}")
+            continue
+        if route.community != community:
+            result.fail(f"({node}) incorrect community value received for {subnet}")
+        if route.local_preference != local_preference:
+            result.fail(f"({node}) incorrect local preference value set for {subnet}")
+    fib = {str(route.prefix): route for route in simulation.fibs.get("r120", [])}
+    for subnet, next_hop, via in [("10.4.1.0/25", "192.168.1.0", "r110"), ("10.4.1.128/25", "192.168.1.3", "r130")]:
+        if subnet not in fib or fib[subnet].next_hop != next_hop:
+            result.fail(f"(r120) route to {subnet} does not pass through {via}")
+
+    for entry in RESTRICTED_COMMANDS:
+        for name in sorted(node for node in nodes if node.startswith("r")):
+            expected = name in entry["nodes"]
+            if config(name).uses(entry["command"]) != expected:
+                checks["Restricted commands check"].fail(f'({name}) {"does not use" if expected else "uses"} {entry["command"]}')
+    return checks
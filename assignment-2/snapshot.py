@@ -0,0 +1,185 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Condition, Thread
+from time import monotonic
+from typing import Optional
+
+import frr
+import router
+import vty
+
+FIB = 'vtysh -c "show ip route json"'
+# Table name and the command it is read from, on every router.
+TABLES = {"fib": FIB, "bgp": frr.RIB, "rip": frr.RIP}
+
+RIP_ROUTE = re.compile(r"^[A-Z]\(\w+\)$")
+
+
+def parse_fib(output) -> dict:
+    """Installed routes from zebra's "show ip route json", i.e. the FIB as zebra programmed it into the kernel."""
+    routes = {}
+    for prefix, entries in frr.load_json(output).items():
+        for entry in entries if isinstance(entries, list) else []:
+            if not entry.get("installed"):
+                continue
+            nexthops = [
+                f'via {nexthop["ip"]}' if "ip" in nexthop else f'dev {nexthop.get("interfaceName", "?")}'
+                for nexthop in entry.get("nexthops", [])
+                if nexthop.get("fib", True)
+            ]
+            routes[prefix] = f'{entry.get("protocol", "?")} {", ".join(nexthops)}'
+    return routes
+
+
+def parse_bgp(output) -> dict:
+    routes = {}
+    for prefix, paths in frr.parse_rib(output).items():
+        routes[prefix] = ", ".join(
+            sorted(
+                f'{"*" if path.best else ""}via {path.next_hop} metric {path.metric} locprf {path.local_preference}'
+                for path in paths
+            )
+        )
+    return routes
+
+
+def parse_rip(output) -> dict:
+    """Routes from "show ip rip", keeping next hop and metric but not the refresh timer, which changes every poll."""
+    routes = {}
+    for line in output.splitlines():
+        words = line.split()
+        if len(words) >= 4 and RIP_ROUTE.match(words[0]):
+            routes[words[1]] = f"{words[0]} via {words[2]} metric {words[3]}"
+    return routes
+
+
+PARSERS = {"fib": parse_fib, "bgp": parse_bgp, "rip": parse_rip}
+
+
+@dataclass
+class Change:
+    router: str
+    table: str
+    prefix: str
+    before: Optional[str]
+    after: Optional[str]
+    time: Optional[float] = None
+
+    def __str__(self):
+        when = f"{self.time:+.2f}s " if self.time is not None else ""
+        return f"{when}({self.router}) {self.table} {self.prefix}: {self.before or '-'} -> {self.after or '-'}\n"
+
+
+@dataclass
+class Snapshot:
+    """Routing tables of many routers, keyed by (router, table) and then by prefix, captured at time."""
+
+    time: float
+    tables: dict = field(default_factory=dict)
+
+    def diff(self, other: "Snapshot") -> list:
+        """Changes from this snapshot to other, over the (router, table) pairs both of them hold."""
+        changes = []
+        for key in sorted(self.tables.keys() & other.tables.keys()):
+            before, after = self.tables[key], other.tables[key]
+            for prefix in sorted(before.keys() | after.keys()):
+                if before.get(prefix) != after.get(prefix):
+                    changes.append(Change(key[0], key[1], prefix, before.get(prefix), after.get(prefix)))
+        return changes
+
+    def merge(self, other: "Snapshot") -> "Snapshot":
+        """This snapshot updated with whatever other captured, keeping tables other could not read."""
+        return Snapshot(other.time, {**self.tables, **other.tables})
+
+
+def capture(net, routers=None, fallback=True) -> Snapshot:
+    """Captures the FIB, BGP RIB and RIP table of every FRR router in parallel.
+
+    Without fallback only vty sessions are used, and routers whose daemons cannot be reached are left out of the
+    snapshot rather than failing it.
+    """
+    if routers is None:
+        routers = [host.name for host in net.hosts if isinstance(host, router.FRRRouter)]
+
+    def read(name):
+        node = net.getNodeByName(name)
+        try:
+            return {(name, table): PARSERS[table](vty.SESSIONS.cmd(node, command, fallback=fallback)) for table, command in TABLES.items()}
+        except OSError:
+            return {}
+
+    snapshot = Snapshot(monotonic())
+    if not routers:
+        return snapshot
+    with ThreadPoolExecutor(max_workers=len(routers)) as pool:
+        for tables in pool.map(read, routers):
+            snapshot.tables.update(tables)
+    return snapshot
+
+
+class Recorder:
+    """Captures snapshots in the background and timestamps every route change relative to entering the context.
+
+    Only vty sessions are used, so node shells stay free for the code under observation, e.g. a RouteWatcher.
+    """
+
+    def __init__(self, net, routers=None, interval=0.2):
+        self.net = net
+        self.routers = routers
+        self.interval = interval
+        self.changes = []
+        self.last_change = None
+        self.polls = 0
+        self.condition = Condition()
+        self.running = False
+        self.thread = None
+
+    def __enter__(self):
+        self.baseline = capture(self.net, self.routers, fallback=False)
+        self.start = self.baseline.time
+        self.running = True
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+
+    def run(self):
+        current = self.baseline
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: not self.running, self.interval)
+                if not self.running:
+                    return
+            snapshot = current.merge(capture(self.net, self.routers, fallback=False))
+            changes = current.diff(snapshot)
+            with self.condition:
+                for change in changes:
+                    change.time = snapshot.time - self.start
+                self.changes.extend(changes)
+                if changes:
+                    self.last_change = snapshot.time - self.start
+                self.polls = 0 if changes else self.polls + 1
+                self.condition.notify_all()
+            current = snapshot
+
+    def settled(self, stable_polls=3) -> bool:
+        """Whether the tables changed since entering the context and have since held still for stable_polls snapshots."""
+        with self.condition:
+            return self.last_change is not None and self.polls >= stable_polls
+
+    def wait_stable(self, timeout, stable_polls=3) -> Optional[float]:
+        """Waits until stable_polls snapshots in a row show no change and returns when the last change appeared.
+
+        Returns 0 if nothing changed at all, or None if the tables were still changing after timeout seconds.
+        """
+        with self.condition:
+            remaining = timeout - (monotonic() - self.start)
+            if not self.condition.wait_for(lambda: self.polls >= stable_polls, max(remaining, 0)):
+                return None
+            return self.last_change or 0.0
@@ -0,0 +1,131 @@
+import os
+from dataclasses import dataclass, field
+from ipaddress import IPv4Address
+
+from declarative import DeclarativeTopology
+
+LINK_BASE = IPv4Address("172.16.0.0")
+EBGP_MESHES = ["chain", "ring", "full"]
+
+
+@dataclass
+class RouterSpec:
+    name: str
+    asn: int
+    loopback: str
+    interfaces: dict = field(default_factory=dict)
+    rip_networks: list = field(default_factory=list)
+    ibgp: list = field(default_factory=list)
+    ebgp: list = field(default_factory=list)
+
+
+@dataclass
+class Lab:
+    """A generated lab: node declarations, links, expected BGP neighbours and an frr.conf per router."""
+
+    nodes: list
+    links: list
+    neighbors: list
+    configs: dict
+
+    def topology(self) -> DeclarativeTopology:
+        return DeclarativeTopology(self.nodes, self.links)
+
+    def write(self, directory):
+        """Writes the frr.conf files in the same layout as a submission directory."""
+        for name, config in self.configs.items():
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+            with open(os.path.join(directory, name, "frr.conf"), "w") as f:
+                f.write(config)
+
+
+def as_number(index, ases):
+    # Private 2-byte ASNs run out after 1022 ASes, so larger labs use the 4-byte private range.
+    return 64512 + index if ases <= 1022 else 4200000000 + index
+
+
+def as_pairs(ases, mesh):
+    if mesh not in EBGP_MESHES:
+        raise ValueError(f"unknown eBGP mesh {mesh}, expected one of {EBGP_MESHES}")
+    if mesh == "full":
+        return [(a, b) for a in range(ases) for b in range(a + 1, ases)]
+    pairs = [(a, a + 1) for a in range(ases - 1)]
+    if mesh == "ring" and ases > 2:
+        pairs.append((ases - 1, 0))
+    return pairs
+
+
+def generate(ases, routers_per_as, mesh="ring") -> Lab:
+    """Generates ases ASes of routers_per_as routers each, joined by a ring running RIP inside every AS.
+
+    Routers in an AS form a full iBGP mesh over their loopbacks. ASes peer over eBGP following mesh (chain, ring
+    or full); the eBGP sessions of an AS are spread over its routers.
+    """
+    if routers_per_as > 254:
+        raise ValueError("at most 254 routers per AS are supported")
+    if ases > 65535:
+        raise ValueError("at most 65535 ASes are supported")
+    routers = [
+        [
+            RouterSpec(f"a{a + 1}r{r + 1}", as_number(a + 1, ases), f"100.{(a + 1) >> 8}.{(a + 1) & 255}.{r + 1}/32")
+            for r in range(routers_per_as)
+        ]
+        for a in range(ases)
+    ]
+    links = []
+
+    def connect(router1, router2):
+        address = LINK_BASE + 2 * len(links)
+        intf1 = f"{router1.name}-eth{len(router1.interfaces)}"
+        intf2 = f"{router2.name}-eth{len(router2.interfaces)}"
+        router1.interfaces[intf1] = f"{address}/31"
+        router2.interfaces[intf2] = f"{address + 1}/31"
+        links.append(((router1.name, intf1), (router2.name, intf2)))
+        return str(address), str(address + 1)
+
+    for members in routers:
+        ring = [(i, i + 1) for i in range(len(members) - 1)]
+        if len(members) > 2:
+            ring.append((len(members) - 1, 0))
+        for i, j in ring:
+            address1, _ = connect(members[i], members[j])
+            members[i].rip_networks.append(f"{address1}/31")
+            members[j].rip_networks.append(f"{address1}/31")
+        for member in members:
+            member.ibgp = [peer.loopback.split("/")[0] for peer in members if peer is not member]
+
+    sessions = [0] * ases
+    for a, b in as_pairs(ases, mesh):
+        router1 = routers[a][sessions[a] % routers_per_as]
+        router2 = routers[b][sessions[b] % routers_per_as]
+        sessions[a] += 1
+        sessions[b] += 1
+        address1, address2 = connect(router1, router2)
+        router1.ebgp.append((address2, router2.asn))
+        router2.ebgp.append((address1, router1.asn))
+
+    flat = [router for members in routers for router in members]
+    nodes = [{"name": router.name, "loopback": router.loopback, "interfaces": router.interfaces} for router in flat]
+    neighbors = [{"node": router.name, "include": router.ibgp + [address for address, _ in router.ebgp]} for router in flat]
+    configs = {router.name: frr_config(router) for router in flat}
+    return Lab(nodes, links, neighbors, configs)
+
+
+def frr_config(router: RouterSpec) -> str:
+    router_id = router.loopback.split("/")[0]
+    lines = ["!"]
+    if router.rip_networks:
+        lines += ["router rip", f"  network {router.loopback}"]
+        lines += [f"  network {network}" for network in router.rip_networks]
+        lines += ["!"]
+    lines += [f"router bgp {router.asn}", f"  bgp router-id {router_id}", "  no bgp ebgp-requires-policy"]
+    for peer in router.ibgp:
+        lines += [
+            f"  neighbor {peer} remote-as {router.asn}",
+            f"  neighbor {peer} update-source {router_id}",
+            f"  neighbor {peer} next-hop-self",
+        ]
+    for peer, asn in router.ebgp:
+        lines += [f"  neighbor {peer} remote-as {asn}"]
+    lines += ["  address-family ipv4 unicast", f"    network {router.loopback}", "  exit-address-family", "!"]
+    return "\n".join(lines) + "\n"
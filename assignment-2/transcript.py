@@ -0,0 +1,169 @@
+import gzip
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from threading import Lock, local
+from time import monotonic
+from typing import Optional
+
+import vty
+from mininet.log import warn
+from preflight import DeclaredIntf, DeclaredNode
+
+EXTENSION = ".jsonl.gz"
+
+
+@dataclass
+class Entry:
+    node: str
+    command: str
+    output: str
+    time: float
+
+
+class Recorder:
+    """Records the output of every command the checks run, through node shells or vty sessions, while active.
+
+    Only commands whose output the checks consume are recorded: vty queries made without fallback, i.e. background
+    snapshots, are observational and would otherwise interleave with the checks' own queries.
+    """
+
+    def __init__(self, net):
+        self.net = net
+        self.entries = []
+        self.lock = Lock()
+        self.nested = local()
+        self.start = None
+
+    def add(self, node, command, output):
+        with self.lock:
+            self.entries.append(Entry(node, command, output, monotonic() - self.start))
+
+    def wrap_node(self, node):
+        cmd = node.cmd
+
+        def record(*args, **kwargs):
+            output = cmd(*args, **kwargs)
+            if not getattr(self.nested, "active", False):
+                self.add(node.name, " ".join(args), output)
+            return output
+
+        node.cmd = record
+
+    def wrap_sessions(self):
+        cmd = vty.SESSIONS.cmd
+
+        def record(node, command, timeout=None, fallback=True):
+            # A vty query falling back to node.cmd must only be recorded once.
+            self.nested.active = True
+            try:
+                output = cmd(node, command, timeout, fallback)
+            finally:
+                self.nested.active = False
+            if fallback:
+                self.add(node.name, command, output)
+            return output
+
+        vty.SESSIONS.cmd = record
+
+    def __enter__(self):
+        self.start = monotonic()
+        for node in self.net.hosts:
+            self.wrap_node(node)
+        self.wrap_sessions()
+        return self
+
+    def __exit__(self, *args):
+        del vty.SESSIONS.cmd
+        for node in self.net.hosts:
+            del node.cmd
+
+    def save(self, path, convergence=None, metrics=None):
+        """Writes the network's nodes and the recorded commands as gzipped JSON lines, nodes first.
+
+        Convergence and the checks' metrics, keyed by check name, are stored with the nodes so a replay can report the
+        recorded timings rather than its own.
+        """
+        hosts = []
+        for node in self.net.hosts:
+            host = {"name": node.name, "intfs": [[port, intf.name, intf.ip, intf.prefixLen] for port, intf in node.intfs.items()]}
+            for attribute in ("loopback", "daemons"):
+                if hasattr(node, attribute):
+                    host[attribute] = getattr(node, attribute)
+            hosts.append(host)
+        with gzip.open(path, "wt") as f:
+            f.write(json.dumps({"hosts": hosts, "convergence": convergence, "metrics": metrics or {}}) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps([entry.node, entry.command, entry.output, round(entry.time, 4)]) + "\n")
+
+
+@dataclass
+class ReplayIntf(DeclaredIntf):
+    def IP(self):
+        return self.ip
+
+
+@dataclass
+class ReplayNode(DeclaredNode):
+    """A node answering commands from a transcript, in the order they were recorded.
+
+    Once a command's recorded outputs are used up its last output is repeated, so polling loops see the final state.
+    Commands that were never recorded return nothing.
+    """
+
+    outputs: dict = field(default_factory=dict, repr=False)
+    lock: Lock = field(default_factory=Lock, repr=False)
+
+    def addIntf(self, port, name, ip, prefixLen):
+        self.intfs[port] = ReplayIntf(name, ip, prefixLen)
+
+    def intfList(self) -> list:
+        return [self.intfs[port] for port in sorted(self.intfs)]
+
+    def IP(self) -> Optional[str]:
+        return self.intfList()[0].ip if self.intfs else None
+
+    def cmd(self, *args, **kwargs) -> str:
+        command = " ".join(args)
+        with self.lock:
+            outputs = self.outputs.get(command)
+            if not outputs:
+                warn(f"({self.name}) no recorded output for {command}\n")
+                return ""
+            return outputs.popleft() if len(outputs) > 1 else outputs[0]
+
+
+class ReplayNet:
+    """Just enough of a Mininet network to run the checks against a transcript, with no root, namespaces or FRR."""
+
+    def __init__(self, hosts, links=None):
+        self.hosts = hosts
+        self.links = links or []
+        self.nodes = {host.name: host for host in hosts}
+
+    def getNodeByName(self, name):
+        return self.nodes[name]
+
+    def configLinkStatus(self, src, dst, status):
+        # The recorded outputs already reflect the link change.
+        pass
+
+
+def load(path):
+    """Reads a transcript written by Recorder.save, returning the ReplayNet and the header without its nodes."""
+    with gzip.open(path, "rt") as f:
+        header = json.loads(f.readline())
+        nodes = {}
+        for host in header["hosts"]:
+            node = ReplayNode(host["name"])
+            for port, name, ip, prefixLen in host["intfs"]:
+                node.addIntf(port, name, ip, prefixLen)
+            for attribute in ("loopback", "daemons"):
+                if attribute in host:
+                    setattr(node, attribute, host[attribute])
+            nodes[node.name] = node
+        for line in f:
+            name, command, output, _ = json.loads(line)
+            nodes[name].outputs.setdefault(command, deque()).append(output)
+    del header["hosts"]
+    return ReplayNet(list(nodes.values())), header
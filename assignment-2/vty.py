@@ -0,0 +1,144 @@
+import re
+import socket
+from threading import Lock
+
+VTY_DIRECTORY = "/var/run/frr"
+# Every reply ends with three NUL bytes and the command's status code, as vtysh expects.
+TERMINATOR = b"\0\0\0"
+
+# Daemons that serve each command family, matched by prefix as vtysh does. None means every running daemon.
+COMMAND_DAEMONS = [
+    ("show running-config", None),
+    ("show bgp", ["bgpd"]),
+    ("show ip bgp", ["bgpd"]),
+    ("show ip rip", ["ripd"]),
+    ("show ip route", ["zebra"]),
+    ("show interface", ["zebra"]),
+]
+
+VTYSH_COMMAND = re.compile(r'^vtysh -c "([^"]*)"$')
+
+
+def vtysh_command(command):
+    """Returns the CLI command wrapped in a single vtysh -c "..." invocation, or None for anything else."""
+    match = VTYSH_COMMAND.match(command.strip())
+    return match.group(1) if match else None
+
+
+def command_daemons(command, daemons) -> list:
+    """Picks the running daemons that answer command, or an empty list if it is not routed here."""
+    for prefix, targets in COMMAND_DAEMONS:
+        if command.startswith(prefix):
+            return list(daemons) if targets is None else [daemon for daemon in targets if daemon in daemons]
+    return []
+
+
+class VtySession:
+    """Persistent connection to one daemon's vty socket, running commands the same way vtysh does."""
+
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self.sock = None
+        self.status = None
+        self.lock = Lock()
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        try:
+            self.sock.connect(self.path)
+            # vty sessions start in view mode, which cannot show the running configuration.
+            self.send("enable")
+        except OSError:
+            self.close()
+            raise
+
+    def send(self, command, timeout=None) -> str:
+        """Sends one command and reads its reply, which is returned whatever the status like vtysh prints it."""
+        self.sock.settimeout(timeout or self.timeout)
+        self.sock.sendall(command.encode() + b"\0")
+        data = bytearray()
+        while len(data) < 4 or data[-4:-1] != TERMINATOR:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionResetError(f"{self.path} closed the connection")
+            data += chunk
+        self.status = data[-1]
+        return data[:-4].decode(errors="replace")
+
+    def execute(self, command, timeout=None) -> str:
+        """Runs command, reconnecting once if the daemon dropped the connection, e.g. after a restart.
+
+        Raises OSError if the daemon cannot be reached or does not answer within timeout seconds.
+        """
+        with self.lock:
+            try:
+                if self.sock is None:
+                    self.connect()
+                return self.send(command, timeout)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close()
+                self.connect()
+                return self.send(command, timeout)
+            except OSError:
+                # A reply that timed out would desynchronise the stream, so the connection is dropped.
+                self.close()
+                raise
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class VtySessions:
+    """Long-lived vty sessions per (node, daemon), used in place of spawning vtysh for every query.
+
+    Daemon sockets are reached from outside the node through /proc/<pid>/root, since /var/run/frr is private to
+    the node's mount namespace.
+    """
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+        self.sessions = {}
+        self.lock = Lock()
+
+    def session(self, node, daemon) -> VtySession:
+        path = f"/proc/{node.pid}/root{VTY_DIRECTORY}/{daemon}.vty"
+        with self.lock:
+            if (node.name, daemon) not in self.sessions or self.sessions[(node.name, daemon)].path != path:
+                self.sessions[(node.name, daemon)] = VtySession(path, self.timeout)
+            return self.sessions[(node.name, daemon)]
+
+    def cmd(self, node, command, timeout=None, fallback=True) -> str:
+        """Runs a vtysh -c "..." command over the node's vty sessions, falling back to node.cmd for anything else.
+
+        Output from several daemons is concatenated in daemon order, as vtysh does for show running-config. Without
+        fallback the node's shell is never used, so this is safe to call from threads that do not own the node:
+        commands no running daemon serves return nothing, and unreachable daemons raise OSError.
+        """
+        cli = vtysh_command(command)
+        daemons = command_daemons(cli, getattr(node, "daemons", [])) if cli is not None else []
+        if not fallback and cli is not None and not daemons:
+            return ""
+        if not daemons or not hasattr(node, "pid"):
+            if not fallback:
+                raise OSError(f"({node.name}) {command} cannot be sent over a vty session")
+            return node.cmd(command)
+        try:
+            return "".join(self.session(node, daemon).execute(cli, timeout) for daemon in daemons)
+        except OSError:
+            if not fallback:
+                raise
+            # The socket can be missing or unreachable, e.g. without access to /proc/<pid>/root; vtysh still works.
+            return node.cmd(command)
+
+    def close(self, name=None):
+        """Closes all sessions, or only those of the named node."""
+        with self.lock:
+            for key in [key for key in self.sessions if name is None or key[0] == name]:
+                self.sessions.pop(key).close()
+
+
+SESSIONS = VtySessions()